@@ -4,9 +4,265 @@ Create a numpy array with the stimulus set data from the stored parameters.
 
 import math
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-import scipy.signal
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Type codes of the segment classes for _fill_segments, segments with
+# _KIND_SKIP are written by the caller
+_KIND_SKIP = -1
+_KIND_CONSTANT = 0
+_KIND_RAMP = 1
+_KIND_CHIRP = 2
+
+
+# Fill kernels
+#
+# Each kernel has a numpy implementation and, if numba is available, a jitted
+# one with the same signature. The numexpr chirp is preferred over the numpy
+# one if numba is missing. The implementation used by the segments is selected
+# after the definitions, the suffixed variants are kept for testing.
+
+def _fill_square_numpy(out, numPointsCycle, half, pos):
+    """
+    Fill `out` with a square wave of amplitude `pos` and cycle length
+    `numPointsCycle`, starting with a positive half cycle of `half` points.
+    """
+
+    idx = np.arange(out.size)
+    pos = out.dtype.type(pos)
+
+    np.copyto(out, np.where(idx % numPointsCycle < half, pos, -pos))
+
+
+def _fill_ramp_numpy(out, amp):
+    """
+    Fill `out` with a linear ramp from zero to `amp`, same as `np.linspace(0.0, amp, out.size)`.
+    """
+
+    out[:] = np.linspace(0.0, amp, out.size)
+
+
+def _chirp_fused_numpy(out, amplitude, f0, f1, t1, logarithmic):
+    """
+    Fill `out` with a chirp of the given amplitude sampled equidistantly from 0 to `t1`.
+
+    Same as `amplitude * scipy.signal.chirp(np.linspace(0, t1, out.size), f0, t1, f1, method, phi=-90)`
+    with method being either "linear" or "logarithmic".
+    """
+
+    x = np.linspace(0, t1, out.size)
+
+    if not logarithmic:
+        phase = 2.0 * np.pi * (f0 * x + 0.5 * (f1 - f0) / t1 * x * x)
+    elif f0 == f1:
+        phase = 2.0 * np.pi * f0 * x
+    else:
+        beta = t1 / math.log(f1 / f0)
+        phase = 2.0 * np.pi * beta * f0 * (np.power(f1 / f0, x / t1) - 1.0)
+
+    phase -= 0.5 * np.pi
+    np.cos(phase, out=out)
+    out *= amplitude
+
+
+def _chirp_fused_numexpr(out, amplitude, f0, f1, t1, logarithmic):
+    """
+    Fill `out` with a chirp of the given amplitude sampled equidistantly from 0 to `t1`, see _chirp_fused_numpy.
+
+    Evaluates the whole expression with numexpr, which is multithreaded and needs no temporaries.
+    """
+
+    x = np.linspace(0, t1, out.size)
+
+    if not logarithmic:
+        expr = "amplitude * cos(2 * pi * (f0 * x + 0.5 * beta * x * x) - 0.5 * pi)"
+        beta = (f1 - f0) / t1
+    elif f0 == f1:
+        expr = "amplitude * cos(2 * pi * f0 * x - 0.5 * pi)"
+        beta = 0.0
+    else:
+        expr = "amplitude * cos(2 * pi * beta * f0 * (exp(logRatio * x / t1) - 1) - 0.5 * pi)"
+        beta = t1 / math.log(f1 / f0)
+
+    numexpr.evaluate(expr,
+                     local_dict={"x": x, "amplitude": amplitude, "f0": f0, "t1": t1, "beta": beta,
+                                 "logRatio": math.log(f1 / f0) if logarithmic else 0.0, "pi": math.pi},
+                     out=out, casting="same_kind")
+
+
+if numexpr is not None:
+    _chirp_fused_fallback = _chirp_fused_numexpr
+else:
+    _chirp_fused_fallback = _chirp_fused_numpy
+
+
+def _batch_chirp_threads(out, amplitudes, f0, f1, t1, logarithmic):
+    """
+    Fill each row of `out` with a chirp of the amplitude given in `amplitudes`, see _chirp_fused_numpy.
+
+    The rows are filled in parallel, numpy and numexpr release the GIL for the heavy lifting.
+    """
+
+    def fill(s):
+        _chirp_fused_fallback(out[s], amplitudes[s], f0, f1, t1, logarithmic)
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(fill, range(out.shape[0])))
+
+
+def _fill_segments_numpy(out, starts, kinds, amplitudes, durations, f0s, f1s, logarithmic):
+    """
+    Fill `out` with the data of consecutive segments given as struct of arrays.
+
+    Segment `i` is of type `kinds[i]` and covers `out[starts[i]:starts[i + 1]]`.
+    """
+
+    for i in range(kinds.size):
+        segment = out[starts[i]:starts[i + 1]]
+        kind = kinds[i]
+
+        if kind == _KIND_CONSTANT:
+            segment.fill(amplitudes[i])
+        elif kind == _KIND_RAMP:
+            _fill_ramp_numpy(segment, amplitudes[i])
+        elif kind == _KIND_CHIRP:
+            _chirp_fused_fallback(segment, amplitudes[i], f0s[i], f1s[i], durations[i], logarithmic[i])
+
+
+if numba is not None:
+
+    # The kernels are compiled on import for the output type of the segments only,
+    # see _compileKernels, other output types are compiled on first use.
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _fill_square_numba(out, numPointsCycle, half, pos):
+        """
+        Fill `out` with a square wave, see _fill_square_numpy.
+        """
+
+        # branchless so that the loop can be vectorized
+        for i in numba.prange(out.size):
+            r = i - (i // numPointsCycle) * numPointsCycle
+            sign = 1 - 2 * (r >= half)
+            out[i] = pos * sign
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _fill_ramp_numba(out, amp):
+        """
+        Fill `out` with a linear ramp from zero to `amp`, see _fill_ramp_numpy.
+        """
+
+        n = out.size
+
+        if n < 2:
+            out[:] = 0.0
+            return
+
+        inv = amp / (n - 1)
+
+        for i in numba.prange(n):
+            out[i] = i * inv
+
+        out[n - 1] = amp
+
+    @numba.njit(cache=True, fastmath=True)
+    def _chirp_beta(f0, f1, t1, logarithmic):
+        """
+        Return the sweep rate parameter of the chirp phase, see _chirp_value.
+        """
+
+        if logarithmic and f0 != f1:
+            return t1 / math.log(f1 / f0)
+
+        return (f1 - f0) / t1
+
+    @numba.njit(cache=True, fastmath=True)
+    def _chirp_value(t, amplitude, f0, f1, t1, beta, logarithmic):
+        """
+        Return the chirp at time `t`.
+
+        Same as `amplitude * scipy.signal.chirp(t, f0, t1, f1, method, phi=-90)` with
+        method being either "linear" or "logarithmic".
+        """
+
+        if not logarithmic:
+            phase = 2.0 * math.pi * (f0 * t + 0.5 * beta * t * t)
+        elif f0 == f1:
+            phase = 2.0 * math.pi * f0 * t
+        else:
+            phase = 2.0 * math.pi * beta * f0 * (math.pow(f1 / f0, t / t1) - 1.0)
+
+        return amplitude * math.cos(phase - 0.5 * math.pi)
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _chirp_fused_numba(out, amplitude, f0, f1, t1, logarithmic):
+        """
+        Fill `out` with a chirp, see _chirp_fused_numpy, but in a single pass over `out`.
+        """
+
+        n = out.size
+        dt = t1 / (n - 1) if n > 1 else 0.0
+        beta = _chirp_beta(f0, f1, t1, logarithmic)
+
+        for i in numba.prange(n):
+            out[i] = _chirp_value(i * dt, amplitude, f0, f1, t1, beta, logarithmic)
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _batch_chirp_numba(out, amplitudes, f0, f1, t1, logarithmic):
+        """
+        Fill each row of `out` with a chirp of the amplitude given in `amplitudes`, see _chirp_fused_numpy.
+
+        The rows are filled in parallel.
+        """
+
+        numSweeps, n = out.shape
+        dt = t1 / (n - 1) if n > 1 else 0.0
+        beta = _chirp_beta(f0, f1, t1, logarithmic)
+
+        for s in numba.prange(numSweeps):
+            for i in range(n):
+                out[s, i] = _chirp_value(i * dt, amplitudes[s], f0, f1, t1, beta, logarithmic)
+
+    @numba.njit(cache=True)
+    def _fill_segments_numba(out, starts, kinds, amplitudes, durations, f0s, f1s, logarithmic):
+        """
+        Fill `out` with the data of consecutive segments, see _fill_segments_numpy.
+        """
+
+        for i in range(kinds.size):
+            segment = out[starts[i]:starts[i + 1]]
+            kind = kinds[i]
+
+            if kind == _KIND_CONSTANT:
+                segment[:] = amplitudes[i]
+            elif kind == _KIND_RAMP:
+                _fill_ramp_numba(segment, amplitudes[i])
+            elif kind == _KIND_CHIRP:
+                _chirp_fused_numba(segment, amplitudes[i], f0s[i], f1s[i], durations[i], logarithmic[i])
+
+    _fill_square = _fill_square_numba
+    _fill_ramp = _fill_ramp_numba
+    _chirp_fused = _chirp_fused_numba
+    _batch_chirp = _batch_chirp_numba
+    _fill_segments = _fill_segments_numba
+
+else:
+    _fill_square = _fill_square_numpy
+    _fill_ramp = _fill_ramp_numpy
+    _chirp_fused = _chirp_fused_fallback
+    _batch_chirp = _batch_chirp_threads
+    _fill_segments = _fill_segments_numpy
 
 
 def getSegmentClass(stimRec, channelRec, segmentRec):
@@ -14,17 +270,13 @@ def getSegmentClass(stimRec, channelRec, segmentRec):
     Return the correct derived class instance of Segment for the given records.
     """
 
-    if segmentRec.Class == "Squarewave":
-        return SquareSegment(stimRec, channelRec, segmentRec)
-    elif segmentRec.Class == "Constant":
-        return ConstantSegment(stimRec, channelRec, segmentRec)
-    elif segmentRec.Class == "Ramp":
-        return RampSegment(stimRec, channelRec, segmentRec)
-    elif segmentRec.Class == "Chirpwave":
-        return ChirpSegment(stimRec, channelRec, segmentRec)
-    else:
+    cls = _SEGMENT_CLASSES.get(segmentRec.Class)
+
+    if cls is None:
         raise ValueError(f"Unsupported stim segment class {segmentRec.Class}")
 
+    return cls(stimRec, channelRec, segmentRec)
+
 
 # Use Replay->Show PGF Template in PatchMaster to view the stimset of the current trace
 #
@@ -35,7 +287,9 @@ def getSegmentClass(stimRec, channelRec, segmentRec):
 class Segment(ABC):
     """
         Base class for all segment types.
-        Derived class must implement `createArray` only.
+        Derived class must implement `_fillArray`. Sweep dependent segment
+        types must also set `KIND` for createSweepArray, with
+        `_kernelParameters` overridden if the defaults do not fit.
 
         The following segment types are supported:
         - Constant
@@ -50,6 +304,13 @@ class Segment(ABC):
         Note: Only currently used segment options/modes/specialities are implemented.
     """
 
+    # dtype of the arrays returned by createArray, PatchMaster stores the
+    # parameters in single precision. Set to np.float64 for double precision output.
+    DTYPE = np.float32
+
+    # type code for _fill_segments
+    KIND = None
+
     def __init__(self, stimRec, channelRec, segmentRec):
         self.xDelta = {"mode": segmentRec.DurationIncMode,
                        "factor": segmentRec.DeltaTFactor,
@@ -67,15 +328,21 @@ class Segment(ABC):
         # and we want to have "mV" for VC and "pA" for IC
         self.amplitudeScale = 1e3
 
+        if self.amplitude is not None:
+            self.amplitudeScaled = self.applyAmplitudeScale(self.amplitude)
+        else:
+            self.amplitudeScaled = None
+
+        # Result of createArray for segments which are identical across sweeps
+        self._cache = None
+
         if not channelRec.StimToDacID['UseStimScale']:
             raise ValueError("The flag UseStimScale of StimToDacID being false is not supported.")
 
     def __str__(self):
-        return ("xDelta={}, yDelta={}, "
-                "duration={}, sampleInterval={}"
-                "amplitudeScale={}").format(self.xDelta, self.yDelta,
-                                            self.duration, self.sampleInterval,
-                                            self.amplitudeScale)
+        return (f"xDelta={self.xDelta}, yDelta={self.yDelta}, "
+                f"duration={self.duration}, sampleInterval={self.sampleInterval}, "
+                f"amplitudeScale={self.amplitudeScale}")
 
     @staticmethod
     def _hasDelta(deltaDict):
@@ -123,14 +390,113 @@ class Segment(ABC):
         return Segment._applyDelta(self.xDelta, xValue, sweepNo), Segment._applyDelta(self.yDelta, yValue, sweepNo)
 
     @abstractmethod
+    def _fillArray(self, out, duration, amplitude):
+        """
+        Fill `out` with the stimset data for the given, already stepped, duration and scaled amplitude.
+
+        `out` has exactly the number of points of the duration.
+        """
+
+        pass
+
     def createArray(self, sweep):
         """
         Return a numpy array with the stimset data.
 
         Units are [mV] for voltage clamp and [pA] for current clamp.
+
+        Arrays of sweep invariant segments are cached and therefore read-only.
         """
 
-        pass
+        if self._cache is not None:
+            return self._cache
+
+        duration, amplitude = self.doStepping(sweep)
+
+        segment = self._allocate(self.calculateNumberOfPoints(duration))
+        self._fillArray(segment, duration, amplitude)
+
+        if self._isSweepInvariant():
+            segment.setflags(write=False)
+            self._cache = segment
+
+        return segment
+
+    @classmethod
+    def createSweepArray(cls, segments, sweep):
+        """
+        Return a numpy array with the stimset data of all segments for the given sweep.
+
+        Same as concatenating the createArray results of all segments, but the
+        sweep dependent segments are filled in one call of _fill_segments from
+        a struct of arrays of their parameters, the sweep invariant segments
+        are copied from their cache.
+        """
+
+        starts = np.zeros(len(segments) + 1, dtype=np.int64)
+        np.cumsum([segment.getNumberOfPoints(sweep) for segment in segments], out=starts[1:])
+
+        out = np.empty(starts[-1], dtype=cls.DTYPE)
+
+        if not segments:
+            return out
+
+        parameters = []
+
+        for segment, start in zip(segments, starts):
+            if segment._isSweepInvariant():
+                segment.writeInto(out, start, sweep)
+                parameters.append((_KIND_SKIP, 0.0, 0.0, 0.0, 0.0, False))
+            else:
+                parameters.append((segment.KIND,) + segment._kernelParameters(*segment.doStepping(sweep)))
+
+        kinds, amplitudes, durations, f0s, f1s, logarithmic = zip(*parameters)
+
+        _fill_segments(out, starts,
+                       np.array(kinds, dtype=np.int64),
+                       np.array(amplitudes, dtype=np.float64),
+                       np.array(durations, dtype=np.float64),
+                       np.array(f0s, dtype=np.float64),
+                       np.array(f1s, dtype=np.float64),
+                       np.array(logarithmic, dtype=np.bool_))
+
+        return out
+
+    def _kernelParameters(self, duration, amplitude):
+        """
+        Return the parameters of this segment for _fill_segments for the given,
+        already stepped, duration and scaled amplitude.
+
+        Return: amplitude, duration, start frequency, end frequency and logarithmic flag
+        """
+
+        return amplitude, duration, 0.0, 0.0, False
+
+    def writeInto(self, out, start, sweep):
+        """
+        Write the stimset data into `out` starting at index `start`, see also Segment.createArray.
+
+        Return the number of points written.
+        """
+
+        if self._isSweepInvariant():
+            segment = self.createArray(sweep)
+            numPoints = segment.size
+        else:
+            segment = None
+            duration, amplitude = self.doStepping(sweep)
+            numPoints = self.calculateNumberOfPoints(duration)
+
+        if start + numPoints > out.size:
+            raise ValueError(f"Output array of size {out.size} is too small for {numPoints} points at {start}.")
+
+        if segment is not None:
+            # sweep invariant data is cached
+            out[start:start + numPoints] = segment
+        else:
+            self._fillArray(out[start:start + numPoints], duration, amplitude)
+
+        return numPoints
 
     def hasXDelta(self):
         """
@@ -146,15 +512,39 @@ class Segment(ABC):
 
         return Segment._hasDelta(self.yDelta)
 
+    def _isSweepInvariant(self):
+        """
+        Return true if the stimset data is the same for all sweeps.
+        """
+
+        return not self.hasXDelta() and not self.hasYDelta()
+
+    def _allocate(self, numPoints):
+        """
+        Return an uninitialized array for the stimset data of createArray.
+        """
+
+        return np.empty(numPoints, dtype=self.DTYPE)
+
     def doStepping(self, sweepNo):
         """
         Apply the delta modes the given number of times (once per sweep)
         """
 
+        if not self.hasYDelta():
+            return Segment._applyDelta(self.xDelta, self.duration, sweepNo), self.amplitudeScaled
+
         duration, amplitude = self._step(self.duration, self.amplitude, sweepNo)
 
         return duration, self.applyAmplitudeScale(amplitude)
 
+    def getNumberOfPoints(self, sweepNo):
+        """
+        Return the number of points of this segment for the given sweep.
+        """
+
+        return self.calculateNumberOfPoints(Segment._applyDelta(self.xDelta, self.duration, sweepNo))
+
     def calculateNumberOfPoints(self, duration):
         """
         Return the number of points of this segment.
@@ -192,6 +582,10 @@ class Segment(ABC):
 # Top info box: Square Kind
 class SquareSegment(Segment):
 
+    # no delta modes are supported, so square segments are always sweep
+    # invariant and never filled by _fill_segments
+    KIND = None
+
     def __init__(self, stimRec, channelRec, segmentRec):
         super().__init__(stimRec, channelRec, segmentRec)
 
@@ -202,6 +596,8 @@ class SquareSegment(Segment):
         self.baseIncr = channelRec.Square_BaseIncr
         self.kind = channelRec.Square_Kind
 
+        self.posAmpScaled = self.applyAmplitudeScale(self.posAmp)
+
         if self.baseIncr != 0:
             raise ValueError(f"Unsupported baseIncr={self.baseIncr}")
         elif self.durationFactor != 0:
@@ -212,71 +608,79 @@ class SquareSegment(Segment):
             raise ValueError(f"Delta modes are not supported.")
         elif not (self.cycleDuration > 0):
             raise ValueError(f"Invalid cycle duration.")
+        elif self._getNumberOfPointsCycle() < 2:
+            raise ValueError(f"Cycle duration {self.cycleDuration} is shorter than two sample intervals.")
 
     def __str__(self):
-        return super().__str__() + \
-               (", "
-                "+amp={}, -amp={}, "
-                "cycleDur={}, durFactor={}, "
-                "baseIncr={}, squareKind={}").format(self.posAmp, self.negAmp,
-                                                     self.cycleDuration, self.durationFactor,
-                                                     self.baseIncr, self.kind)
+        return (f"{super().__str__()}, "
+                f"+amp={self.posAmp}, -amp={self.negAmp}, "
+                f"cycleDur={self.cycleDuration}, durFactor={self.durationFactor}, "
+                f"baseIncr={self.baseIncr}, squareKind={self.kind}")
 
     def getAmplitude(self, channelRec, segmentRec):
         return None
 
-    def createArray(self, sweep):
+    def _getNumberOfPointsCycle(self):
+        """
+        Return the number of points of one cycle, the last cycle might be incomplete.
+        """
 
-        numPoints = self.calculateNumberOfPoints(self.duration)
-        numPointsCycle = math.trunc(self.cycleDuration / self.sampleInterval)
-        oneCycle = np.zeros([numPointsCycle])
+        numPointsCycle = self.cycleDuration / self.sampleInterval
 
-        halfCycleLength = int(numPointsCycle/2)
-        oneCycle[:halfCycleLength] = self.applyAmplitudeScale(self.posAmp)
-        oneCycle[halfCycleLength:] = self.applyAmplitudeScale(-self.posAmp)
+        # round values which are only off due to floating point errors, e.g. 29.999999999999996
+        if math.isclose(numPointsCycle, round(numPointsCycle)):
+            return round(numPointsCycle)
 
-        numCycles = math.ceil(self.duration / self.cycleDuration)
+        return math.trunc(numPointsCycle)
 
-        segment = np.tile(oneCycle, numCycles)
-        segment.resize(numPoints)
+    def _fillArray(self, out, duration, amplitude):
+        numPointsCycle = self._getNumberOfPointsCycle()
 
-        return segment
+        _fill_square(out, numPointsCycle, numPointsCycle // 2, self.posAmpScaled)
 
 
 class ConstantSegment(Segment):
 
+    KIND = _KIND_CONSTANT
+
     def __init__(self, stimRec, channelRec, segmentRec):
         super().__init__(stimRec, channelRec, segmentRec)
 
     def __str__(self):
-        return super().__str__() + \
-               (", "
-                "amp={}").format(self.amplitude)
+        return f"{super().__str__()}, amp={self.amplitude}"
 
-    def createArray(self, sweep):
+    def createArray(self, sweep, readonly=False):
+        """
+        Return a numpy array with the stimset data, see Segment.createArray.
+
+        With `readonly` set a read-only broadcast view of the amplitude is
+        returned instead, which does not allocate the full array.
+        """
+
+        if not readonly:
+            return super().createArray(sweep)
 
         duration, amplitude = self.doStepping(sweep)
         numPoints = self.calculateNumberOfPoints(duration)
 
-        return np.full((numPoints), amplitude)
+        return np.broadcast_to(self.DTYPE(amplitude), numPoints)
+
+    def _fillArray(self, out, duration, amplitude):
+        out.fill(amplitude)
 
 
 class RampSegment(Segment):
 
+    KIND = _KIND_RAMP
+
     def __init__(self, stimRec, channelRec, segmentRec):
         super().__init__(stimRec, channelRec, segmentRec)
 
     def __str__(self):
-        return super().__str__() + \
-               (", "
-                "amp={}").format(self.amplitude)
-
-    def createArray(self, sweep):
+        return f"{super().__str__()}, amp={self.amplitude}"
 
-        duration, amplitude = self.doStepping(sweep)
-        numPoints = self.calculateNumberOfPoints(duration)
-
-        return np.linspace(0.0, amplitude, numPoints)
+    def _fillArray(self, out, duration, amplitude):
+        _fill_ramp(out, amplitude)
 
 
 # Chirp wave dialog in PatchMaster:
@@ -288,6 +692,8 @@ class RampSegment(Segment):
 # Segment Points is calculated
 class ChirpSegment(Segment):
 
+    KIND = _KIND_CHIRP
+
     def __init__(self, stimRec, channelRec, segmentRec):
         super().__init__(stimRec, channelRec, segmentRec)
 
@@ -297,28 +703,71 @@ class ChirpSegment(Segment):
 
         if self.kind != "Exponential" and self.kind != "Linear":
             raise ValueError(f"The chirp kind {self.kind} is not supported.")
+        elif self.kind == "Exponential" and self.startFreq * self.endFreq <= 0.0:
+            raise ValueError(f"Invalid frequencies {self.startFreq} and {self.endFreq} for an exponential chirp.")
 
     def __str__(self):
-        return super().__str__() + \
-                (", "
-                 "amp {}, start freq {}, end freq = {}, chirp kind = {}"
-                 ).format(self.amplitude, self.startFreq, self.endFreq, self.kind)
+        return (f"{super().__str__()}, "
+                f"amp {self.amplitude}, start freq {self.startFreq}, "
+                f"end freq = {self.endFreq}, chirp kind = {self.kind}")
 
     def getAmplitude(self, channelRec, segmentRec):
         # The amplitude is half of the peak-to-peak amplitude and that is
         # stored in the DAT file.
         return channelRec.Chirp_Amplitude * 0.5
 
-    def createArray(self, sweep):
+    def _fillArray(self, out, duration, amplitude):
+        _chirp_fused(out, amplitude, self.startFreq, self.endFreq, duration,
+                     self.kind == "Exponential")
 
-        duration, amplitude = self.doStepping(sweep)
-        numPoints = self.calculateNumberOfPoints(duration)
-        x = np.linspace(0, duration, numPoints)
+    def _kernelParameters(self, duration, amplitude):
+        return amplitude, duration, self.startFreq, self.endFreq, self.kind == "Exponential"
+
+    def createArrayBatch(self, sweeps):
+        """
+        Return a 2D numpy array with the stimset data of the given sweeps, one row per sweep.
+
+        Only supported if the duration does not depend on the sweep, i.e. without x delta mode.
+        """
+
+        if self.hasXDelta():
+            raise ValueError("Batch creation is not supported with x delta mode.")
+
+        numPoints = self.calculateNumberOfPoints(self.duration)
+        amplitudes = np.array([self.doStepping(sweep)[1] for sweep in sweeps], dtype=np.float64)
+
+        out = np.empty((len(amplitudes), numPoints), dtype=self.DTYPE)
+        _batch_chirp(out, amplitudes, self.startFreq, self.endFreq, self.duration,
+                     self.kind == "Exponential")
+
+        return out
+
+
+# StimSegmentRecord.Class to Segment class, see getSegmentClass
+_SEGMENT_CLASSES = {"Squarewave": SquareSegment,
+                    "Constant": ConstantSegment,
+                    "Ramp": RampSegment,
+                    "Chirpwave": ChirpSegment}
+
+
+def _compileKernels(dtype):
+    """
+    Compile the numba kernels for output arrays of the given numpy dtype.
+
+    Loads them from the on-disk cache if available.
+    """
+
+    t = numba.from_dtype(dtype)
+    i8 = numba.int64
+    f8 = numba.float64
+    b1 = numba.boolean
+
+    _fill_square_numba.compile((t[::1], i8, i8, f8))
+    _fill_ramp_numba.compile((t[::1], f8))
+    _chirp_fused_numba.compile((t[::1], f8, f8, f8, f8, b1))
+    _batch_chirp_numba.compile((t[:, ::1], f8[::1], f8, f8, f8, b1))
+    _fill_segments_numba.compile((t[::1], i8[::1], i8[::1], f8[::1], f8[::1], f8[::1], f8[::1], b1[::1]))
 
-        if self.kind == "Exponential":
-            method = "logarithmic"
-        elif self.kind == "Linear":
-            method = "linear"
 
-        return amplitude * scipy.signal.chirp(x, f0=self.startFreq, f1=self.endFreq,
-                                              t1=duration, method=method, phi=-90)
+if numba is not None:
+    _compileKernels(Segment.DTYPE)
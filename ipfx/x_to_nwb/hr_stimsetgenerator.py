@@ -1,6 +1,4 @@
-import numpy as np
-
-from ipfx.x_to_nwb.hr_segments import getSegmentClass
+from ipfx.x_to_nwb.hr_segments import getSegmentClass, Segment
 from ipfx.x_to_nwb.conversion_utils import getChannelRecordIndex, getStimulusRecordIndex
 
 
@@ -58,16 +56,11 @@ class StimSetGenerator:
 
             allSweeps = []
 
-            for sweep in range(stimRec.NumberSweeps):
-                stimset = np.empty([0])
-                for segmentRec in channelRec:
-                    cls = getSegmentClass(stimRec, channelRec, segmentRec)
-                    # print(cls)
-                    segment = cls.createArray(sweep)
-
-                    stimset = np.append(stimset, segment, axis=0)
+            # create the segments once so that they can reuse their data across sweeps
+            segments = [getSegmentClass(stimRec, channelRec, segmentRec) for segmentRec in channelRec]
 
-                allSweeps.append(stimset)
+            for sweep in range(stimRec.NumberSweeps):
+                allSweeps.append(Segment.createSweepArray(segments, sweep))
 
             self.cache[key] = allSweeps
 
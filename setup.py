@@ -6,6 +6,9 @@ import glob
 with open("requirements.txt", "r") as requirements_file:
     required = requirements_file.read().splitlines()
 
+with open("requirements-fast.txt", "r") as requirements_file:
+    required_fast = requirements_file.read().splitlines()
+
 version_file_path = os.path.join(
     os.path.dirname(__file__),
     "ipfx",
@@ -59,6 +62,7 @@ setup(
     url="https://github.com/AllenInstitute/ipfx",
     packages=find_packages(exclude=["tests", "tests.*"]),
     install_requires=required,
+    extras_require={"fast": required_fast},
     include_package_data=True,
     setup_requires=['pytest-runner'],
     keywords=["neuroscience", "bioinformatics", "scientific"],
@@ -0,0 +1,313 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import scipy.signal
+
+from ipfx.x_to_nwb import hr_segments
+from ipfx.x_to_nwb.hr_segments import getSegmentClass, Segment
+from ipfx.x_to_nwb.hr_stimsetgenerator import StimSetGenerator
+
+
+def make_records(segmentClass, duration=0.01, sampleInterval=1e-4, **kwargs):
+    stimRec = SimpleNamespace(SampleInterval=sampleInterval)
+
+    channelRec = SimpleNamespace(StimToDacID={"UseStimScale": True, "UseRelative": False},
+                                 Holding=0.0,
+                                 Square_PosAmpl=0.1,
+                                 Square_NegAmpl=0.0,
+                                 Square_Cycle=0.004,
+                                 Square_DurFactor=0,
+                                 Square_BaseIncr=0,
+                                 Square_Kind="Common Frequency",
+                                 Chirp_StartFreq=1.0,
+                                 Chirp_EndFreq=40.0,
+                                 Chirp_Kind="Linear",
+                                 Chirp_Amplitude=0.2)
+
+    segmentRec = SimpleNamespace(Class=segmentClass,
+                                 Duration=duration,
+                                 DurationIncMode="Inc",
+                                 DeltaTFactor=1.0,
+                                 DeltaTIncrement=0.0,
+                                 VoltageIncMode="Inc",
+                                 DeltaVFactor=1.0,
+                                 DeltaVIncrement=0.0,
+                                 Voltage=-0.07,
+                                 VoltageSource="Constant")
+
+    for key, value in kwargs.items():
+        if hasattr(channelRec, key):
+            setattr(channelRec, key, value)
+        else:
+            setattr(segmentRec, key, value)
+
+    return stimRec, channelRec, segmentRec
+
+
+def test_square_segment_partial_last_cycle():
+    segment = getSegmentClass(*make_records("Squarewave"))
+    data = segment.createArray(0)
+
+    # 100 points with 40 points per cycle
+    expected = np.tile(np.repeat([100.0, -100.0], 20), 3)[:100]
+
+    assert data.shape == (100,)
+    assert np.array_equal(data, expected)
+
+
+def test_square_segment_single_incomplete_cycle():
+    segment = getSegmentClass(*make_records("Squarewave", duration=0.003))
+    data = segment.createArray(0)
+
+    assert np.array_equal(data, np.repeat([100.0, -100.0], [20, 10]))
+
+
+@pytest.mark.parametrize("cycle", [5e-5, 1.5e-4])
+def test_square_segment_cycle_shorter_than_two_samples(cycle):
+    with pytest.raises(ValueError):
+        getSegmentClass(*make_records("Squarewave", Square_Cycle=cycle))
+
+
+def test_constant_segment_readonly_view():
+    segment = getSegmentClass(*make_records("Constant"))
+
+    data = segment.createArray(0)
+    view = segment.createArray(0, readonly=True)
+
+    assert np.array_equal(data, np.full(100, -70.0))
+    assert np.array_equal(view, data)
+    assert not view.flags.writeable
+
+
+@pytest.mark.parametrize("kind, method", [("Linear", "linear"), ("Exponential", "logarithmic")])
+def test_chirp_segment_matches_scipy(kind, method):
+    segment = getSegmentClass(*make_records("Chirpwave", duration=1.0, Chirp_Kind=kind))
+    data = segment.createArray(0)
+
+    x = np.linspace(0, 1.0, 10000)
+    expected = 100.0 * scipy.signal.chirp(x, f0=1.0, f1=40.0, t1=1.0, method=method, phi=-90)
+
+    assert data.dtype == np.float32
+    assert np.allclose(data, expected, rtol=0, atol=1e-4)
+
+
+def test_ramp_segment():
+    segment = getSegmentClass(*make_records("Ramp", DeltaVIncrement=0.01))
+
+    assert np.allclose(segment.createArray(0), np.linspace(0.0, -70.0, 100))
+    assert np.allclose(segment.createArray(2), np.linspace(0.0, -50.0, 100))
+
+
+def test_sweep_invariant_segments_are_cached():
+    segment = getSegmentClass(*make_records("Chirpwave"))
+
+    data = segment.createArray(0)
+
+    assert segment.createArray(1) is data
+    assert not data.flags.writeable
+
+
+def test_constant_segment_cache_respects_stepping():
+    segment = getSegmentClass(*make_records("Constant", DeltaVIncrement=0.01))
+
+    assert np.allclose(segment.createArray(0), -70.0)
+    assert np.allclose(segment.createArray(1), -60.0)
+    assert np.allclose(segment.createArray(0), -70.0)
+
+
+def test_sweep_invariant_constant_segment_is_cached():
+    segment = getSegmentClass(*make_records("Constant"))
+
+    data = segment.createArray(0)
+
+    assert segment.createArray(1) is data
+    assert not data.flags.writeable
+
+
+def test_unsupported_segment_class():
+    with pytest.raises(ValueError):
+        getSegmentClass(*make_records("Sine"))
+
+
+def test_square_segment_cycle_length_without_rounding_error():
+    # 0.0003 / 1e-5 is 29.999999999999996 in floating point arithmetic
+    segment = getSegmentClass(*make_records("Squarewave", duration=0.003, sampleInterval=1e-5,
+                                            Square_Cycle=0.0003))
+    data = segment.createArray(0)
+
+    assert np.array_equal(data, np.tile(np.repeat([100.0, -100.0], 15), 10))
+
+
+@pytest.mark.parametrize("sampleInterval, duration", [(1 / 30000, 0.1), (1 / 3000, 1.0), (1 / 7000, 0.5)])
+def test_sample_interval_not_representable_in_picoseconds(sampleInterval, duration):
+    segment = getSegmentClass(*make_records("Constant", duration=duration, sampleInterval=sampleInterval))
+
+    assert segment.createArray(0).shape == (round(duration / sampleInterval),)
+
+
+def test_square_segment_cycle_length_with_non_picosecond_sample_interval():
+    segment = getSegmentClass(*make_records("Squarewave", duration=0.02, sampleInterval=1 / 7000,
+                                            Square_Cycle=0.01))
+    data = segment.createArray(0)
+
+    assert np.array_equal(data, np.tile(np.repeat([100.0, -100.0], 35), 2))
+
+
+def test_duration_not_divisible_by_sample_interval():
+    segment = getSegmentClass(*make_records("Constant", duration=0.01005))
+
+    with pytest.raises(ValueError):
+        segment.createArray(0)
+
+
+def get_kernel(name, backend):
+    """
+    Return the implementation of the fill kernel `name` for `backend` or skip if it is not available.
+    """
+
+    if backend in ("numba", "numexpr"):
+        pytest.importorskip(backend)
+
+    return getattr(hr_segments, f"{name}_{backend}")
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_fill_square_backends(backend):
+    fill = get_kernel("_fill_square", backend)
+    out = np.empty(100, dtype=np.float32)
+
+    fill(out, 40, 20, 100.0)
+
+    assert np.array_equal(out, np.tile(np.repeat([100.0, -100.0], 20), 3)[:100])
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_fill_ramp_backends(backend):
+    fill = get_kernel("_fill_ramp", backend)
+    out = np.empty(100, dtype=np.float32)
+
+    fill(out, -70.0)
+
+    assert np.allclose(out, np.linspace(0.0, -70.0, 100))
+    assert out[-1] == np.float32(-70.0)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numexpr", "numba"])
+@pytest.mark.parametrize("logarithmic, method", [(False, "linear"), (True, "logarithmic")])
+def test_chirp_fused_backends(backend, logarithmic, method):
+    fill = get_kernel("_chirp_fused", backend)
+    out = np.empty(10000, dtype=np.float32)
+
+    fill(out, 100.0, 1.0, 40.0, 1.0, logarithmic)
+
+    x = np.linspace(0, 1.0, 10000)
+    expected = 100.0 * scipy.signal.chirp(x, f0=1.0, f1=40.0, t1=1.0, method=method, phi=-90)
+
+    assert np.allclose(out, expected, rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize("backend", ["threads", "numba"])
+def test_batch_chirp_backends(backend):
+    fill = get_kernel("_batch_chirp", backend)
+    out = np.empty((3, 100), dtype=np.float32)
+    amplitudes = np.array([100.0, 150.0, 200.0])
+
+    fill(out, amplitudes, 1.0, 40.0, 0.01, False)
+
+    x = np.linspace(0, 0.01, 100)
+    expected = scipy.signal.chirp(x, f0=1.0, f1=40.0, t1=0.01, method="linear", phi=-90)
+
+    assert np.allclose(out, amplitudes[:, np.newaxis] * expected, rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_fill_segments_backends(backend):
+    fill = get_kernel("_fill_segments", backend)
+    out = np.full(30, np.nan, dtype=np.float32)
+
+    starts = np.array([0, 10, 20, 25, 30], dtype=np.int64)
+    kinds = np.array([hr_segments._KIND_CONSTANT, hr_segments._KIND_RAMP,
+                      hr_segments._KIND_SKIP, hr_segments._KIND_CHIRP], dtype=np.int64)
+    amplitudes = np.array([-70.0, 10.0, 0.0, 1.0])
+    durations = np.array([1.0, 1.0, 1.0, 1.0])
+    f0s = np.full(4, 1.0)
+    f1s = np.full(4, 2.0)
+    logarithmic = np.zeros(4, dtype=bool)
+
+    fill(out, starts, kinds, amplitudes, durations, f0s, f1s, logarithmic)
+
+    x = np.linspace(0, 1.0, 5)
+    chirp = scipy.signal.chirp(x, f0=1.0, f1=2.0, t1=1.0, method="linear", phi=-90)
+
+    assert np.array_equal(out[:10], np.full(10, -70.0))
+    assert np.allclose(out[10:20], np.linspace(0.0, 10.0, 10))
+    assert np.all(np.isnan(out[20:25]))
+    assert np.allclose(out[25:], chirp, rtol=0, atol=1e-5)
+
+
+class Node(list):
+    """
+    Minimal stand-in for the tree nodes of a PGF tree.
+    """
+
+    def __init__(self, children, record):
+        super().__init__(children)
+        self.__dict__.update(vars(record))
+
+
+def test_stimset_generator_writes_segments_into_one_array():
+    stimRec, channelRec, constantRec = make_records("Constant", DeltaVIncrement=0.01)
+    _, _, chirpRec = make_records("Chirpwave")
+    _, _, rampRec = make_records("Ramp", duration=0.005)
+
+    stimRec = Node([Node([constantRec, chirpRec, rampRec], channelRec)], stimRec)
+    stimRec.NumberSweeps = 3
+    stimRec.ActualDacChannels = 1
+    stimRec[0].AdcChannel = 0
+
+    generator = StimSetGenerator(SimpleNamespace(pgf=[stimRec]))
+    stimsets = generator.fetch(SimpleNamespace(StimCount=1), SimpleNamespace(AdcChannel=0))
+
+    assert len(stimsets) == 3
+
+    for sweep, stimset in enumerate(stimsets):
+        expected = np.concatenate([getSegmentClass(stimRec, channelRec, segmentRec).createArray(sweep)
+                                   for segmentRec in (constantRec, chirpRec, rampRec)])
+
+        assert stimset.shape == (250,)
+        assert np.array_equal(stimset, expected)
+
+
+def test_chirp_segment_batch_creation():
+    segment = getSegmentClass(*make_records("Chirpwave", DeltaVIncrement=0.05))
+    data = segment.createArrayBatch(range(3))
+
+    assert data.shape == (3, 100)
+
+    for sweep in range(3):
+        assert np.allclose(data[sweep], segment.createArray(sweep))
+
+
+def test_chirp_segment_batch_creation_requires_fixed_duration():
+    segment = getSegmentClass(*make_records("Chirpwave", DeltaTIncrement=0.01))
+
+    with pytest.raises(ValueError):
+        segment.createArrayBatch(range(3))
+
+
+def test_create_sweep_array_with_all_segment_kinds():
+    records = [make_records("Constant", DeltaVIncrement=0.01),
+               make_records("Squarewave"),
+               make_records("Ramp", DeltaVIncrement=0.01, DeltaTIncrement=0.001),
+               make_records("Chirpwave", DeltaVIncrement=0.05, Chirp_Kind="Exponential"),
+               make_records("Constant")]
+
+    segments = [getSegmentClass(*r) for r in records]
+
+    for sweep in range(3):
+        expected = np.concatenate([getSegmentClass(*r).createArray(sweep) for r in records])
+        data = Segment.createSweepArray(segments, sweep)
+
+        assert data.shape == expected.shape
+        assert np.allclose(data, expected, rtol=0, atol=1e-4)